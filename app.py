@@ -1,38 +1,246 @@
 import random
 import hashlib
-from flask import Flask, render_template, request, abort, jsonify, Response
-from flask_caching import Cache
+from flask import Flask, render_template, request, abort, jsonify, Response, g
 import os
+import sys
 import json
 import sqlite3
 from datetime import datetime
 from markupsafe import Markup
+from jinja2 import BaseLoader, TemplateNotFound
+from jinja2.loaders import split_template_path
+from jinja2.utils import LRUCache
 import urllib.parse
-
-# Cache for random seeds based on city-state pairs
-spintax_seed_cache = {}
+import re
+import threading
+import time
+import bisect
+from collections import OrderedDict
+from collections.abc import Mapping
+
+# Matches {option1|option2|...} spintax groups
+SPINTAX_PATTERN = re.compile(r'\{([^}]*)\}')
+
+# How many FAQs / reviews from a content pool are shown on one page
+FAQS_PER_PAGE = 5
+REVIEWS_PER_PAGE = 6
+
+# Admission control for crawler bursts
+ADMISSION_CONTROL_ENABLED = True
+# Only the page views render; admin, lookup API and asset requests are never limited
+ADMISSION_CONTROL_ENDPOINTS = {'handle_home', 'service_page', 'about_page', 'contact_page', 'services_page'}
+RATE_LIMIT_PER_SECOND = 5.0     # sustained page renders per client
+RATE_LIMIT_BURST = 20           # token bucket size per client
+MAX_TRACKED_CLIENTS = 10000     # least recently seen clients are forgotten first
+MAX_CONCURRENT_RENDERS = 8      # renders allowed in flight across all clients
+RENDER_CACHE_TIMEOUT = 300      # seconds a cached render is served as fresh
+MAX_CACHED_RENDERS = 20000
+RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Clients allowed to read /admin/*; everyone else gets the site's 404 page
+ADMIN_ALLOWED_IPS = {'127.0.0.1', '::1'}
+
+# In-process caches; see /admin/cache-stats for their live sizes
+JSON_CACHE_TIMEOUT = 300        # seconds before domain JSON files are read again
+JSON_CACHE_MAX_ENTRIES = 1000
+JSON_CACHE_MAX_BYTES = 64 * 1024 * 1024
+CONTENT_POOL_CACHE_MAX_ENTRIES = 5000
+CONTENT_POOL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+SPINTAX_SEED_CACHE_MAX_ENTRIES = 50000
+SERVICE_CATALOG_CACHE_MAX_ENTRIES = 1000
+SERVICE_CATALOG_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# SQLite database; run migrate_db.py to add the slug columns and indexes
+DB_PATH = 'newcities.db'
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_RELOAD_INTERVAL = 5          # seconds between checks for a changed DB file, 0 disables
+
+# Post-render output stage
+MINIFY_HTML = True              # collapse whitespace and drop comments in rendered pages
+EXTRACT_INLINE_CSS = True       # move large <style> blocks into shared, content-hashed assets
+EXTRACT_CSS_MIN_BYTES = 1024    # smaller <style> blocks stay inline
+CSS_ASSET_FOLDER = "static/assets"  # under the app folder; shared by every worker process
+MAX_CSS_ASSETS = 256                # stylesheets also kept in memory, the rest are read from disk
+CSS_ASSETS_MAX_BYTES = 16 * 1024 * 1024
+CSS_ASSET_MAX_AGE = 31536000
+CSS_ASSET_NOT_FOUND_MAX_AGE = 60
+
+# Compiled templates kept in memory, shared by every domain using the same file
+TEMPLATE_CACHE_SIZE = 2000
+
+# Lookup API
+API_CACHE_MAX_AGE = 86400       # seconds browsers and proxies may cache lookups
+API_NOT_FOUND_MAX_AGE = 60      # misses are cached briefly; a DB reload may add the zip
+API_MAX_CITY_RESULTS = 50
 
 app = Flask(__name__,
                 template_folder="templates")
 
-# Configure Flask-Caching
-cache = Cache(app, config={
-        'CACHE_TYPE': 'SimpleCache',
-        'CACHE_DEFAULT_TIMEOUT': 0  # Never expire cache
-    })
-
 app.config['SERVER_NAME'] = 'demo.local:8000'
 
 
+def approx_size(value, seen=None):
+    """Rough number of bytes held by a value and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(approx_size(k, seen) + approx_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(approx_size(getattr(value, slot), seen) for slot in value.__slots__ if hasattr(value, slot))
+    elif hasattr(value, "__dict__"):
+        size += approx_size(vars(value), seen)
+    return size
+
+class BoundedCache:
+    """Thread-safe LRU cache bounded by entry count and approximate bytes.
+
+    Entries older than ``timeout`` seconds (if set) count as misses. Keeps
+    hit, miss and eviction counters for /admin/cache-stats.
+    """
+
+    def __init__(self, name, max_entries, max_bytes=None, timeout=None, sizeof=approx_size):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.sizeof = sizeof
+        self.entries = OrderedDict()  # key -> (value, size, stored at)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.timeout is not None and time.monotonic() - entry[2] >= self.timeout:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, size, time.monotonic())
+            self.bytes += size
+            while self.entries and (len(self.entries) > self.max_entries
+                                    or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+
+    def delete_where(self, predicate):
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+# Every BoundedCache by name, reported by /admin/cache-stats
+caches = {}
+
+json_cache = BoundedCache("json", JSON_CACHE_MAX_ENTRIES, JSON_CACHE_MAX_BYTES, timeout=JSON_CACHE_TIMEOUT)
+# Random seeds for city-state pairs; grows with every pair a bot probes, so keep it bounded
+spintax_seed_cache = BoundedCache("spintax_seeds", SPINTAX_SEED_CACHE_MAX_ENTRIES, sizeof=lambda value: 64)
+
+
+class ThemeTemplateLoader(BaseLoader):
+    """Loads templates by path: "templates/<name>" from the shared folder or
+    "domains/<main_domain>/templates/<name>" from a domain theme.
+
+    Jinja caches compiled templates under that path, so every domain without
+    its own copy of a template shares one compiled template, and the mtime
+    check recompiles a template when its file changes.
+    """
+    def get_source(self, environment, template):
+        pieces = split_template_path(template)
+        if pieces[0] == "domains":
+            # relative to the working directory, like the domain JSON files
+            path = os.path.join(*pieces)
+        else:
+            if pieces[0] == "templates":
+                pieces = pieces[1:]
+            path = os.path.join(app.root_path, app.template_folder, *pieces)
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, encoding="utf-8") as f:
+                source = f.read()
+        except OSError:
+            raise TemplateNotFound(template)
+
+        def uptodate():
+            try:
+                return os.path.getmtime(path) == mtime
+            except OSError:
+                return False
+        return source, os.path.abspath(path), uptodate
+
+app.jinja_loader = ThemeTemplateLoader()
+# Jinja keeps compiled templates in its own LRU; give it room for domain themes
+app.jinja_env.cache = LRUCache(TEMPLATE_CACHE_SIZE)
+app.jinja_env.auto_reload = True
+
+
+def get_db_signature():
+    stat = os.stat(DB_PATH)
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
 # Database cache initialization
 class DatabaseCache:
+    """Snapshot of the Cities table. Never modified after it is built;
+    a changed DB file gets a new snapshot (see reload_db_cache)."""
     def __init__(self):
+        # Taken before reading, so a write during the load triggers another reload
+        self.signature = get_db_signature()
         self.states = {}
         self.cities = {}
         self.zip_codes = {}
+        self.city_rows = {}          # (lowercase city, state abbr) -> (main zip, zips)
+        self.zip_index = {}          # zip -> (city_name, state abbr)
+        self.city_prefix_keys = ()   # sorted lowercase "city state" keys for bisect
+        self.city_prefix_index = ()  # (city_name, state abbr), parallel to city_prefix_keys
         self._load_data()
     def _load_data(self):
-        with sqlite3.connect('newcities.db') as conn:
+        with sqlite3.connect(DB_PATH) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -43,6 +251,7 @@ class DatabaseCache:
                 self.states[abbr] = row['state_name']
 
             # 2) load cities grouped by state
+            prefix_entries = []
             cursor.execute("SELECT city_name, state_code, main_zip_code, zip_codes FROM Cities")
             for row in cursor:
                 abbr = row['state_code'].lower()
@@ -53,14 +262,50 @@ class DatabaseCache:
                 key = city.lower()
                 zips = [z.strip() for z in row['zip_codes'].split(',') if z.strip()]
                 self.zip_codes.setdefault(key, []).extend(zips)
+                # add zip→city index; a city's main zip wins over shared zips
+                main_zip = row['main_zip_code'].strip()
+                self.city_rows[(key, abbr)] = (main_zip, tuple(zips))
+                if main_zip:
+                    self.zip_index[main_zip] = (city, abbr)
+                for zip_code in zips:
+                    self.zip_index.setdefault(zip_code, (city, abbr))
+                prefix_entries.append((f"{key} {abbr}", city, abbr))
+
+            # 3) sorted prefix index for city autocomplete
+            prefix_entries.sort()
+            self.city_prefix_keys = tuple(entry[0] for entry in prefix_entries)
+            self.city_prefix_index = tuple((entry[1], entry[2]) for entry in prefix_entries)
+
+        # freeze the per-state and per-city lists so the snapshot can be shared
+        self.cities = {abbr: tuple(cities) for abbr, cities in self.cities.items()}
+        self.zip_codes = {key: tuple(zips) for key, zips in self.zip_codes.items()}
+
+    def find_city_by_zip(self, zip_code):
+        return self.zip_index.get(zip_code.strip())
+
+    def find_cities_by_prefix(self, prefix, limit):
+        prefix = prefix.replace('-', ' ').strip().lower()
+        if not prefix:
+            return []
+        keys = self.city_prefix_keys
+        start = bisect.bisect_left(keys, prefix)
+        matches = []
+        for i in range(start, min(start + limit, len(keys))):
+            if not keys[i].startswith(prefix):
+                break
+            matches.append(self.city_prefix_index[i])
+        return matches
                 
 # Initialize database cache at startup
 db_cache = DatabaseCache()
 
-@cache.memoize(timeout=300)
 def load_json(filename):
-    with open(filename, 'r') as f:
-        return json.load(f)
+    data = json_cache.get(filename)
+    if data is None:
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        json_cache.set(filename, data)
+    return data
 
 def get_main_domain():
     host = request.host
@@ -113,35 +358,22 @@ def load_json_for_request():
         json_data[key] = data
     return json_data
 
-def replace_placeholders(text, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes=[], city_zip_code=""):
-    import re
-    pattern = r'\{([^}]*)\}'
-    
+def get_spintax_seed(city_name, state_abbreviation):
     # Generate a consistent seed for this city-state pair
     city_state_key = f"{city_name}|{state_abbreviation}"
-    
+
     # Check if we already have a seed for this city-state pair
-    if city_state_key not in spintax_seed_cache:
+    seed_value = spintax_seed_cache.get(city_state_key)
+    if seed_value is None:
         # Create a reproducible seed by hashing the city-state key
         hash_obj = hashlib.md5(city_state_key.encode())
         seed_value = int(hash_obj.hexdigest(), 16) % (2**32)  # Convert to a 32-bit integer
-        spintax_seed_cache[city_state_key] = seed_value
-    
-    # Get the seed for this city-state pair
-    seed = spintax_seed_cache[city_state_key]
-    
-    # Create a random generator with the consistent seed
-    rng = random.Random(seed)
-    
-    def random_replacer(match):
-        options = match.group(1).split('|')
-        return rng.choice(options)
-        
-    # Step 1: Replace random choice patterns with consistent choices
-    text = re.sub(pattern, random_replacer, text)
+        spintax_seed_cache.set(city_state_key, seed_value)
 
-    # Step 2: Replace placeholders
-    text = text.replace("[Service]", service_name)\
+    return seed_value
+
+def substitute_placeholders(text, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes=[], city_zip_code=""):
+    return text.replace("[Service]", service_name)\
                 .replace("[service]", service_name.lower())\
                 .replace("[City-State]", f"{city_name}, {state_abbreviation}")\
                 .replace("[city-state]", f"{city_name.lower()}, {state_abbreviation.lower()}")\
@@ -156,39 +388,229 @@ def replace_placeholders(text, service_name, city_name, state_abbreviation, stat
                 .replace("[Company Name]", required_data.get("Company Name", "N/A"))\
                 .replace("[City Zip Code]", city_zip_code)\
                 .replace("[Zip Codes]", ", ".join(str(z) for z in zip_codes if z))
-    return text
+
+def replace_placeholders(text, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes=[], city_zip_code=""):
+    # Create a random generator with the consistent seed for this city-state pair
+    rng = random.Random(get_spintax_seed(city_name, state_abbreviation))
+
+    def random_replacer(match):
+        options = match.group(1).split('|')
+        return rng.choice(options)
+
+    # Step 1: Replace random choice patterns with consistent choices
+    text = SPINTAX_PATTERN.sub(random_replacer, text)
+
+    # Step 2: Replace placeholders
+    return substitute_placeholders(text, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code)
+
+class CompiledText:
+    """A content string parsed once into literal and spintax parts.
+
+    Rendering gives the same output as ``replace_placeholders`` on the
+    original string, without re-running the regex on every request.
+    """
+    __slots__ = ("parts", "has_spintax", "has_placeholders")
+
+    def __init__(self, text):
+        # re.split with a capture group alternates literal, options, literal, ...
+        pieces = SPINTAX_PATTERN.split(text)
+        self.parts = tuple(
+            piece if i % 2 == 0 else tuple(piece.split('|'))
+            for i, piece in enumerate(pieces)
+        )
+        self.has_spintax = len(self.parts) > 1
+        self.has_placeholders = '[' in text
+
+    def render(self, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes=[], city_zip_code=""):
+        if self.has_spintax:
+            rng = random.Random(get_spintax_seed(city_name, state_abbreviation))
+            text = "".join(
+                part if i % 2 == 0 else rng.choice(part)
+                for i, part in enumerate(self.parts)
+            )
+        else:
+            text = self.parts[0]
+        if not self.has_placeholders:
+            return text
+        return substitute_placeholders(text, service_name, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code)
+
+class PoolEntry:
+    """One FAQ or review from a content pool with its string fields precompiled."""
+    __slots__ = ("raw", "fields")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.fields = {key: CompiledText(value) for key, value in raw.items() if isinstance(value, str)}
+
+    def render(self, key, *args):
+        compiled = self.fields.get(key)
+        if compiled is None:
+            return ""
+        return compiled.render(*args)
+
+class ContentPool:
+    """Immutable, precompiled FAQ or review pool shared by every request.
+
+    ``select`` picks a stable subset per city by sampling indices with a
+    city-seeded generator, so the pool itself is never copied or mutated.
+    """
+    __slots__ = ("source", "entries")
+
+    def __init__(self, source):
+        self.source = source
+        self.entries = tuple(PoolEntry(item) for item in (source or ()) if isinstance(item, dict))
+
+    def select(self, seed_key, limit):
+        count = len(self.entries)
+        if count <= limit:
+            return self.entries
+        hash_obj = hashlib.md5(seed_key.encode())
+        rng = random.Random(int(hash_obj.hexdigest(), 16) % (2**32))
+        # Keep the authored order of the chosen entries
+        return tuple(self.entries[i] for i in sorted(rng.sample(range(count), limit)))
+
+# Compiled pools keyed by (domain, pool name); rebuilt when the JSON is reloaded
+content_pools = BoundedCache("content_pools", CONTENT_POOL_CACHE_MAX_ENTRIES, CONTENT_POOL_CACHE_MAX_BYTES)
+content_pools_lock = threading.Lock()
+
+def get_content_pool(pool_key, source):
+    pool = content_pools.get(pool_key)
+    if pool is not None and pool.source is source:
+        return pool
+    with content_pools_lock:
+        pool = content_pools.get(pool_key)
+        if pool is None or pool.source is not source:
+            pool = ContentPool(source)
+            content_pools.set(pool_key, pool)
+    return pool
+
+def select_pool_entries(pool_name, source, city_name, state_abbreviation, limit):
+    pool = get_content_pool((get_main_domain(), pool_name), source)
+    return select_city_entries(pool, pool_name, city_name, state_abbreviation, limit)
+
+def select_city_entries(pool, pool_name, city_name, state_abbreviation, limit):
+    return pool.select(f"{city_name}|{state_abbreviation}|{pool_name}", limit)
+
+class CompiledService:
+    """One services.json entry with its text fields and FAQ/review pools precompiled."""
+    __slots__ = ("data", "slug", "fields", "faqs", "reviews")
+
+    def __init__(self, data):
+        self.data = data
+        self.slug = data.get("slug")
+        self.fields = {key: CompiledText(value) for key, value in data.items() if isinstance(value, str)}
+        # Check for both uppercase and lowercase keys for FAQ and reviews
+        self.faqs = ContentPool(data.get("FAQ") or data.get("faqs", []))
+        self.reviews = ContentPool(data.get("Reviews") or data.get("reviews", []))
+
+class ServiceCatalog:
+    """A domain's services.json compiled once: services by slug plus the
+    prebuilt listings for the city home page and the services page."""
+    __slots__ = ("source", "services", "by_slug", "home_listing", "services_listing")
+
+    def __init__(self, source):
+        # the list of service entries from services.json
+        self.source = source
+        self.services = tuple(CompiledService(item) for item in source if isinstance(item, dict))
+        self.by_slug = {}
+        for service in self.services:
+            if isinstance(service.slug, str):
+                # the first service with a slug wins, as with the old linear search
+                self.by_slug.setdefault(service.slug, service)
+        self.home_listing = tuple({
+            "name": service.data.get("Service Name"),
+            "url": f"/{service.slug}",
+            "description": service.data.get("Short Description", "")
+        } for service in self.services)
+        self.services_listing = tuple({
+            "name": service.data.get("Service Name"),
+            "url": f"/{service.slug}"
+        } for service in self.services if service.data.get("Service Name") and service.slug)
+
+service_catalogs = BoundedCache("service_catalogs", SERVICE_CATALOG_CACHE_MAX_ENTRIES, SERVICE_CATALOG_CACHE_MAX_BYTES)
+service_catalogs_lock = threading.Lock()
+
+def get_service_catalog(json_data):
+    """The compiled catalog for this request's domain, rebuilt only when
+    the contents of its services.json change."""
+    services = json_data.get("services", {})
+    # Key on the list itself: load_json_for_request wraps a flat services.json
+    # list in a new dict on every request, but the list is the cached object
+    source = services.get("Services", []) if isinstance(services, dict) else services
+    if not isinstance(source, list):
+        source = []
+    main_domain = get_main_domain()
+    catalog = service_catalogs.get(main_domain)
+    if catalog is not None and catalog.source is source:
+        return catalog
+    with service_catalogs_lock:
+        catalog = service_catalogs.get(main_domain)
+        if catalog is None or (catalog.source is not source and catalog.source != source):
+            catalog = ServiceCatalog(source)
+            service_catalogs.set(main_domain, catalog)
+        else:
+            # the JSON was read again but is unchanged; keep the compiled catalog
+            catalog.source = source
+    return catalog
+
+# One read-only connection per worker thread
+db_local = threading.local()
 
 def get_db_connection():
-    conn = sqlite3.connect('newcities.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return (connection, whether the DB has the migrate_db.py columns).
+
+    Call once per query and use both values: immutable=1 connections never
+    see a replaced file, so this reopens the thread's connection whenever a
+    new DatabaseCache snapshot has been swapped in.
+    """
+    signature = db_cache.signature
+    conn = getattr(db_local, "conn", None)
+    if conn is not None and db_local.signature != signature:
+        conn.close()
+        conn = None
+    if conn is None:
+        uri = f"file:{urllib.parse.quote(os.path.abspath(DB_PATH))}?mode=ro&immutable=1"
+        conn = sqlite3.connect(uri, uri=True)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(Cities)")}
+        # Fall back to LOWER() filters on databases that were not migrated yet
+        db_local.migrated = {'city_slug', 'state_code_lc'} <= columns
+        db_local.signature = signature
+        db_local.conn = conn
+    return conn, db_local.migrated
 
-@cache.memoize(timeout=86400)  # Cache for 1 day
 def get_state_full_name(state_abbr):
     return db_cache.states.get(state_abbr)
 
-@cache.memoize(timeout=86400)  # Cache for 1 day
 def state_exists(state_abbr):
     return state_abbr in db_cache.states
 
-@cache.memoize(timeout=86400)  # Cache for 1 day
 def get_cities_in_state(state_abbr):
     return db_cache.cities.get(state_abbr, [])
 
 def get_city_info(city_subdomain, state_abbr):
-    city_norm = city_subdomain.replace('-', ' ').lower()
     abbr = state_abbr.lower()
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """SELECT city_name, main_zip_code
-           FROM Cities
-           WHERE LOWER(city_name)=?
-             AND LOWER(state_code)=?""",
-        (city_norm, abbr)
-    )
+    conn, migrated = get_db_connection()
+    if migrated:
+        # Rows added after the last migrate_db.py run have no slug yet,
+        # so match those the old way
+        cursor = conn.execute(
+            """SELECT city_name, main_zip_code
+               FROM Cities
+               WHERE (state_code_lc=? AND city_slug=?)
+                  OR (state_code_lc IS NULL AND LOWER(city_name)=? AND LOWER(state_code)=?)""",
+            (abbr, city_subdomain.lower(), city_subdomain.replace('-', ' ').lower(), abbr)
+        )
+    else:
+        cursor = conn.execute(
+            """SELECT city_name, main_zip_code
+               FROM Cities
+               WHERE LOWER(city_name)=?
+                 AND LOWER(state_code)=?""",
+            (city_subdomain.replace('-', ' ').lower(), abbr)
+        )
     row = cursor.fetchone()
-    conn.close()
     if not row:
         return None
     return {
@@ -201,42 +623,34 @@ def get_states():
     return list(db_cache.states.keys())
 
 def get_service_content(service_url, city_name, state_abbreviation, state_full_name, json_data, zip_codes, city_zip_code):
-    # Find the service by its slug from the new services.json structure
-        current_service_data = next((s for s in json_data.get("services", {}).get("Services", []) if s.get("slug") == service_url), None)
+    # Find the service by its slug in the compiled services.json catalog
+        compiled_service = get_service_catalog(json_data).by_slug.get(service_url)
 
-        if current_service_data:
+        if compiled_service:
+            current_service_data = compiled_service.data
             required_data = json_data.get("required", {})
             service_name_for_placeholders = current_service_data.get("Service Name", "")
 
             # Prepare FAQ for the specific service
             service_faqs = []
-            # Check for both uppercase and lowercase keys for FAQ
-            faq_data = current_service_data.get("FAQ") or current_service_data.get("faqs", [])
-            if faq_data:
-                for faq_item in faq_data:
+            if compiled_service.faqs.entries:
+                for faq_item in select_city_entries(compiled_service.faqs, f"service:{service_url}:faqs", city_name, state_abbreviation, FAQS_PER_PAGE):
                     service_faqs.append({
-                        "question": replace_placeholders(faq_item.get("Question", ""), service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code),
-                        "answer": Markup(replace_placeholders(faq_item.get("Answer", ""), service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
+                        "question": faq_item.render("Question", service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code),
+                        "answer": Markup(faq_item.render("Answer", service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
                     })
 
             # Prepare Reviews for the specific service
             service_reviews = []
-            # Check for both uppercase and lowercase keys for reviews
-            review_data = current_service_data.get("Reviews") or current_service_data.get("reviews", [])
-            if review_data:
-                for review_item in review_data:
+            if compiled_service.reviews.entries:
+                for review_item in select_city_entries(compiled_service.reviews, f"service:{service_url}:reviews", city_name, state_abbreviation, REVIEWS_PER_PAGE):
                     service_reviews.append({
-                        "name": review_item.get("name"),
-                        "review": Markup(replace_placeholders(review_item.get("review", ""), service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
+                        "name": review_item.raw.get("name"),
+                        "review": Markup(review_item.render("review", service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
                     })
             
-            # Process other text fields with placeholders
-            processed_service_data = {}
-            for key, value in current_service_data.items():
-                if isinstance(value, str):
-                    processed_service_data[key] = Markup(replace_placeholders(value, service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
-                elif key not in ["FAQ", "Reviews"]: # Avoid re-processing FAQ and Reviews
-                    processed_service_data[key] = value
+            # Other text fields get their placeholders replaced when read
+            processed_service_data = LazyContent(current_service_data, (service_name_for_placeholders, city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code), compiled=compiled_service.fields)
 
             # Ensure essential keys are present, even if empty, and add processed FAQs and Reviews
             service_content = {
@@ -254,32 +668,70 @@ def get_service_content(service_url, city_name, state_abbreviation, state_full_n
             return service_content
         return None
 
-def get_random_faqs(city_name, state_abbreviation, json_data, zip_codes, city_zip_code):
-    required_data = json_data["required"]
-    selected_faqs = random.sample(json_data["faq"]["faqs"], 5)
-    for faq in selected_faqs:
-        faq["question"] = Markup(replace_placeholders(
-            faq["question"],
-                "",
-                city_name,
-                state_abbreviation,
-                "",
-                required_data,
-                zip_codes,
-                city_zip_code
-            ))
-        faq["answer"] = Markup(replace_placeholders(
-                faq["answer"],
-                "",
-                city_name,
-                state_abbreviation,
-                "",
-                required_data,
-                zip_codes,
-                city_zip_code
-            ))
+class LazyContent(Mapping):
+    """Read-only view of a content mapping from the domain JSON.
+
+    A string field gets its placeholders replaced the first time it is read
+    and the result is kept, so fields a template never reads cost nothing.
+    Dicts under ``nested_keys`` (e.g. "CTA") are wrapped the same way; other
+    values are returned as they are. ``compiled`` optionally maps fields to
+    their precompiled CompiledText.
+    """
+    __slots__ = ("source", "placeholder_args", "nested_keys", "compiled", "expanded")
+
+    def __init__(self, source, placeholder_args, nested_keys=(), compiled=None):
+        self.source = source
+        # replace_placeholders arguments after the text
+        self.placeholder_args = placeholder_args
+        self.nested_keys = nested_keys
+        self.compiled = compiled or {}
+        self.expanded = {}
+
+    def __getitem__(self, key):
+        try:
+            return self.expanded[key]
+        except KeyError:
+            pass
+        value = self.source[key]
+        if key in self.compiled:
+            value = Markup(self.compiled[key].render(*self.placeholder_args))
+        elif isinstance(value, str):
+            value = Markup(replace_placeholders(value, *self.placeholder_args))
+        elif isinstance(value, dict) and key in self.nested_keys:
+            value = LazyContent(value, self.placeholder_args)
+        self.expanded[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self.source)
+
+    def __len__(self):
+        return len(self.source)
+
+def get_random_faqs(city_name, state_abbreviation, json_data, zip_codes, city_zip_code, state_full_name=""):
+    """Return the city's stable selection of FAQs from the maincontent pool."""
+    required_data = json_data.get("required", {})
+    faq_data = json_data.get("maincontent", {}).get("FAQ", [])
+    selected_faqs = []
+    for faq_item in select_pool_entries("maincontent:faqs", faq_data, city_name, state_abbreviation, FAQS_PER_PAGE):
+        selected_faqs.append({
+            "Question": faq_item.render("Question", "", city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code),
+            "Answer": Markup(faq_item.render("Answer", "", city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
+        })
     return selected_faqs
 
+def get_random_reviews(city_name, state_abbreviation, json_data, zip_codes, city_zip_code, state_full_name=""):
+    """Return the city's stable selection of reviews from the maincontent pool."""
+    required_data = json_data.get("required", {})
+    review_data = json_data.get("maincontent", {}).get("Reviews", [])
+    selected_reviews = []
+    for review_item in select_pool_entries("maincontent:reviews", review_data, city_name, state_abbreviation, REVIEWS_PER_PAGE):
+        selected_reviews.append({
+            "name": review_item.raw.get("name"),
+            "review": Markup(review_item.render("review", "", city_name, state_abbreviation, state_full_name, required_data, zip_codes, city_zip_code))
+        })
+    return selected_reviews
+
 def get_zip_codes_from_db(city_name):
     # Make sure we're using lowercase for lookup
     city_key = city_name.lower()
@@ -295,6 +747,14 @@ def get_zip_codes_from_db(city_name):
     # Ensure we're returning a list of strings
     return [str(zip_code) for zip_code in zip_codes] if zip_codes else []
 
+def resolve_template(template_name):
+    """Name of the template to render for this request's domain: its theme
+    copy in domains/<main_domain>/templates/ if there is one, else the shared one."""
+    theme_template = f"domains/{get_main_domain()}/templates/{template_name}"
+    if os.path.isfile(theme_template):
+        return theme_template
+    return f"templates/{template_name}"
+
 def get_canonical_url():
     return f"https://{request.host}{request.path}"
 
@@ -305,29 +765,365 @@ def get_current_month_year():
         "year": now.strftime("%Y")
     }
 
+class TokenBucketLimiter:
+    """Per-client token buckets, refilled lazily on each request."""
+
+    def __init__(self, rate, burst, max_clients):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets = OrderedDict()  # client -> [tokens, last refill time]
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def allow(self, client):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self.buckets[client] = bucket
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self.buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.buckets),
+                "bytes": approx_size(self.buckets),
+                "max_entries": self.max_clients,
+                "evictions": self.evictions,
+            }
+
+class RenderCache:
+    """Last good render per (host, path).
+
+    Entries older than ``timeout`` are no longer served as fresh, but are kept
+    so that requests shed under overload can still get a page.
+    """
+
+    def __init__(self, timeout, max_entries, max_bytes):
+        self.timeout = timeout
+        # key -> (body, mimetype, rendered at)
+        self.entries = BoundedCache("renders", max_entries, max_bytes, sizeof=lambda entry: len(entry[0]) + 200)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None, False
+        return entry, time.monotonic() - entry[2] < self.timeout
+
+    def set(self, key, body, mimetype):
+        self.entries.set(key, (body, mimetype, time.monotonic()))
+
+    def delete_where(self, predicate):
+        self.entries.delete_where(predicate)
+
+    def delete_domain(self, main_domain):
+        self.delete_where(lambda key: key[0] == main_domain or key[0].endswith(f".{main_domain}"))
+
+    def __len__(self):
+        return len(self.entries)
+
+client_limiter = TokenBucketLimiter(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, MAX_TRACKED_CLIENTS)
+render_slots = threading.BoundedSemaphore(MAX_CONCURRENT_RENDERS)
+render_cache = RenderCache(RENDER_CACHE_TIMEOUT, MAX_CACHED_RENDERS, RENDER_CACHE_MAX_BYTES)
+
+# Load shedding counters, reported by /admin/load-shedding
+load_shedding_stats = {
+    "admitted": 0,
+    "completed": 0,
+    "cache_hits": 0,
+    "shed_rate_limited": 0,
+    "shed_concurrency": 0,
+    "served_stale": 0,
+    "served_503": 0,
+}
+load_shedding_lock = threading.Lock()
+
+def count_load_stat(name):
+    with load_shedding_lock:
+        load_shedding_stats[name] += 1
+
+def get_client_id():
+    # nginx passes the visitor address in X-Real-IP (see README)
+    return request.headers.get("X-Real-IP") or request.remote_addr
+
+def require_admin():
+    # Behind nginx this is the visitor address, so only requests made on the
+    # server itself (curl localhost) pass
+    if get_client_id() not in ADMIN_ALLOWED_IPS:
+        abort(404)
+
+def cached_response(entry, cache_state):
+    body, mimetype, _ = entry
+    return Response(body, mimetype=mimetype, headers={"X-Render-Cache": cache_state})
+
+def admit_request():
+    """Admit the request for rendering, or answer it without rendering.
+
+    Returns None when the view should run, otherwise the response to send:
+    a fresh cached render, the last good render when the client or the
+    server is over its limit, or a 503 when nothing has been rendered yet.
+    """
+    key = (request.host, request.path)
+    entry, fresh = render_cache.get(key)
+    if entry is not None and fresh:
+        count_load_stat("cache_hits")
+        return cached_response(entry, "HIT")
+
+    if not client_limiter.allow(get_client_id()):
+        count_load_stat("shed_rate_limited")
+    elif not render_slots.acquire(blocking=False):
+        count_load_stat("shed_concurrency")
+    else:
+        g.render_slot = True
+        g.render_cache_key = key
+        count_load_stat("admitted")
+        return None
+
+    if entry is not None:
+        count_load_stat("served_stale")
+        return cached_response(entry, "STALE")
+    count_load_stat("served_503")
+    return Response("Service temporarily overloaded, please retry.", status=503,
+                    mimetype="text/plain", headers={"Retry-After": "5"})
+
+def diff_db_snapshots(old, new):
+    """Compare two DatabaseCache snapshots.
+
+    Returns (changed state abbrs, changed (lowercase city, state abbr) pairs,
+    whether the list of states itself changed).
+    """
+    changed_states = {
+        abbr for abbr in old.states.keys() | new.states.keys()
+        if old.states.get(abbr) != new.states.get(abbr) or old.cities.get(abbr) != new.cities.get(abbr)
+    }
+    all_cities = old.city_rows.keys() | new.city_rows.keys()
+    changed_cities = {key for key in all_cities if old.city_rows.get(key) != new.city_rows.get(key)}
+    # zip codes are looked up by city name alone, so a change there touches
+    # every city sharing the name
+    changed_names = {
+        name for name in old.zip_codes.keys() | new.zip_codes.keys()
+        if old.zip_codes.get(name) != new.zip_codes.get(name)
+    }
+    changed_cities |= {key for key in all_cities if key[0] in changed_names}
+    return changed_states, changed_cities, old.states.keys() != new.states.keys()
+
+def invalidate_db_changes(changed_states, changed_cities, state_list_changed):
+    changed_city_slugs = {(city.replace(' ', '-'), abbr) for city, abbr in changed_cities}
+
+    def affected(key):
+        parts = key[0].lower().split('.')
+        if len(parts) <= 2 or parts[0] == 'www':
+            # home page lists every state
+            return state_list_changed
+        labels = parts[0].split('-')
+        if len(labels) == 1:
+            return labels[0] in changed_states
+        if len(labels) >= 3:
+            # city pages also link to the other cities in their state
+            state = labels[-1]
+            return state in changed_states or ('-'.join(labels[1:-1]), state) in changed_city_slugs
+        return False
+
+    render_cache.delete_where(affected)
+
+db_reload_lock = threading.Lock()
+
+def reload_db_cache():
+    """Rebuild DatabaseCache if newcities.db changed, swap it in and
+    invalidate cached pages for the states and cities that changed.
+
+    Replace the DB file atomically (write a copy, then os.replace) so open
+    read-only connections keep reading a complete file.
+    """
+    global db_cache
+    with db_reload_lock:
+        old = db_cache
+        if get_db_signature() == old.signature:
+            return False
+        new = DatabaseCache()
+        db_cache = new
+        invalidate_db_changes(*diff_db_snapshots(old, new))
+    return True
+
+def watch_db_file():
+    while True:
+        time.sleep(DB_RELOAD_INTERVAL)
+        try:
+            if reload_db_cache():
+                app.logger.info("Reloaded %s", DB_PATH)
+        except Exception:
+            # e.g. the file is mid-write; keep serving the old snapshot and retry
+            app.logger.exception("Could not reload %s", DB_PATH)
+
+db_watcher_pid = None
+db_watcher_lock = threading.Lock()
+
+def start_db_watcher():
+    # Started per process, so forked workers each get their own watcher
+    global db_watcher_pid
+    if DB_RELOAD_INTERVAL <= 0 or db_watcher_pid == os.getpid():
+        return
+    with db_watcher_lock:
+        if db_watcher_pid != os.getpid():
+            db_watcher_pid = os.getpid()
+            threading.Thread(target=watch_db_file, name="db-watcher", daemon=True).start()
+
 @app.before_request
 def before_request():
+    start_db_watcher()
+    if ADMISSION_CONTROL_ENABLED and request.method == 'GET' and request.endpoint in ADMISSION_CONTROL_ENDPOINTS:
+        response = admit_request()
+        if response is not None:
+            return response
     request.json_data = load_json_for_request()
 
+@app.after_request
+def store_render(response):
+    key = g.get("render_cache_key")
+    if key and response.status_code == 200 and response.mimetype == "text/html" and not response.direct_passthrough:
+        render_cache.set(key, response.get_data(), response.mimetype)
+    return response
+
+# Matches the blocks minify_html leaves alone, comments, and whitespace runs
+HTML_MINIFY_PATTERN = re.compile(
+    r'(<(pre|textarea|script|style)\b.*?</\2\s*>)|(<!--(?!\[if).*?-->)|(\s+)', re.S | re.I)
+STYLE_BLOCK_PATTERN = re.compile(r'<style\b([^>]*)>(.*?)</style\s*>', re.S | re.I)
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACING_PATTERN = re.compile(r'\s*([{};,>])\s*')
+
+CSS_ASSET_HASH_PATTERN = re.compile(r'[0-9a-f]{20}')
+
+# Extracted stylesheets are written to CSS_ASSET_FOLDER, so any worker (or the
+# next process after a restart) can serve a hash that a cached page links to.
+# This cache only saves the disk read.
+css_assets = BoundedCache("css_assets", MAX_CSS_ASSETS, CSS_ASSETS_MAX_BYTES, sizeof=len)
+
+def css_asset_path(asset_hash):
+    return os.path.join(app.root_path, CSS_ASSET_FOLDER, f"{asset_hash}.css")
+
+def store_css_asset(asset_hash, body):
+    if css_assets.get(asset_hash) is not None:
+        return
+    path = css_asset_path(asset_hash)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write a private temp file and rename it, so no worker reads a partial file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(body)
+        os.replace(temp_path, path)
+    css_assets.set(asset_hash, body)
+
+def load_css_asset(asset_hash):
+    body = css_assets.get(asset_hash)
+    if body is None:
+        try:
+            with open(css_asset_path(asset_hash), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None
+        css_assets.set(asset_hash, body)
+    return body
+
+def minify_css(css):
+    css = CSS_COMMENT_PATTERN.sub('', css)
+    css = re.sub(r'\s+', ' ', css)
+    css = CSS_SPACING_PATTERN.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def extract_css(match):
+    attrs, css = match.groups()
+    if attrs.strip() or len(css) < EXTRACT_CSS_MIN_BYTES:
+        return match.group(0)
+    body = minify_css(css).encode()
+    asset_hash = hashlib.sha256(body).hexdigest()[:20]
+    try:
+        store_css_asset(asset_hash, body)
+    except OSError:
+        # the asset folder is not writable; keep the styles inline
+        app.logger.exception("Could not write CSS asset %s", asset_hash)
+        return match.group(0)
+    # Served from the main domain so every city subdomain shares one browser cache entry
+    return f'<link rel="stylesheet" href="https://{get_main_domain()}/assets/{asset_hash}.css">'
+
+def minify_html(html):
+    def replacer(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(3):
+            return ''
+        return '\n' if '\n' in match.group(4) else ' '
+
+    if EXTRACT_INLINE_CSS:
+        html = STYLE_BLOCK_PATTERN.sub(extract_css, html)
+    return HTML_MINIFY_PATTERN.sub(replacer, html).strip()
+
+# Registered after store_render so it runs first: the render cache keeps the
+# minified page, and cached pages are not minified again
+@app.after_request
+def optimize_html(response):
+    if (MINIFY_HTML and response.mimetype == "text/html" and not response.direct_passthrough
+            and "X-Render-Cache" not in response.headers):
+        response.set_data(minify_html(response.get_data(as_text=True)))
+    return response
+
+@app.route('/assets/<asset_hash>.css')
+def css_asset(asset_hash):
+    body = load_css_asset(asset_hash) if CSS_ASSET_HASH_PATTERN.fullmatch(asset_hash) else None
+    if body is None:
+        # only briefly, in case the asset is being written by another worker
+        return Response("Not found", status=404, mimetype="text/plain",
+                        headers={"Cache-Control": f"public, max-age={CSS_ASSET_NOT_FOUND_MAX_AGE}"})
+    response = Response(body, mimetype="text/css")
+    response.headers["Cache-Control"] = f"public, max-age={CSS_ASSET_MAX_AGE}, immutable"
+    response.set_etag(asset_hash)
+    return response.make_conditional(request)
+
+@app.teardown_request
+def release_render_slot(exc):
+    if g.pop("render_slot", False):
+        render_slots.release()
+        count_load_stat("completed")
+
 @app.context_processor
 def inject_date():
     return get_current_month_year()
 
 def get_other_cities_in_state(state_abbr, current_city_name):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT city_name
-          FROM Cities
-         WHERE LOWER(state_code) = ?
-           AND LOWER(city_name) != ?
-         ORDER BY city_name ASC
-        """,
-        (state_abbr.lower(), current_city_name.lower())
-    )
-    cities = [row['city_name'] for row in cursor.fetchall()]
-    conn.close()
-    return cities
+    conn, migrated = get_db_connection()
+    if migrated:
+        cursor = conn.execute("""
+            SELECT city_name
+              FROM Cities
+             WHERE (state_code_lc = ? OR (state_code_lc IS NULL AND LOWER(state_code) = ?))
+               AND LOWER(city_name) != ?
+             ORDER BY city_name ASC
+            """,
+            (state_abbr.lower(), state_abbr.lower(), current_city_name.lower())
+        )
+    else:
+        cursor = conn.execute("""
+            SELECT city_name
+              FROM Cities
+             WHERE LOWER(state_code) = ?
+               AND LOWER(city_name) != ?
+             ORDER BY city_name ASC
+            """,
+            (state_abbr.lower(), current_city_name.lower())
+        )
+    return [row['city_name'] for row in cursor.fetchall()]
 
 @app.route('/')
 def handle_home():
@@ -338,7 +1134,7 @@ def handle_home():
         states = get_states()
         state_links = {state: f"https://{state}.{get_main_domain()}" for state in states}
         return render_template(
-            'home.html',
+            resolve_template('home.html'),
             state_links=state_links,
             required=required_data,
             favicon=required_data.get("favicon"),
@@ -368,7 +1164,7 @@ def handle_home():
                         abort(404)
                 
                 return render_template(
-                        'state.html',
+                        resolve_template('state.html'),
                         state_name=state_name,
                         city_links=city_links,
                         required=required_data,
@@ -417,60 +1213,15 @@ def handle_home():
                         city_zip_code
                     )
 
-                # Prepare services data for the template
-                services_list_for_template = []
-                if json_data.get("services") and json_data["services"].get("Services"):
-                    for service_item in json_data["services"]["Services"]:
-                        # Use the main service in the URL if available
-                        if main_service:
-                            # For new format: main-service-city-state.domain.com
-                            services_list_for_template.append({
-                                "name": service_item.get("Service Name"),
-                                "url": f"/{service_item.get('slug')}",
-                                "description": service_item.get("Short Description", "")
-                            })
-                        else:
-                            # For old format: city-state.domain.com
-                            services_list_for_template.append({
-                                "name": service_item.get("Service Name"),
-                                "url": f"/{service_item.get('slug')}",
-                                "description": service_item.get("Short Description", "")
-                            })
-
-                # Prepare FAQ from maincontent
-                faqs_from_maincontent = []
-                if main_content_data.get("FAQ"):
-                    for faq_item in main_content_data["FAQ"]:
-                        faqs_from_maincontent.append({
-                            "Question": replace_placeholders(faq_item.get("Question", ""), "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code),
-                                "Answer": Markup(replace_placeholders(faq_item.get("Answer", ""), "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                            })
+                # Prepare services data for the template (prebuilt per domain)
+                services_list_for_template = get_service_catalog(json_data).home_listing
 
-                # Prepare Reviews from maincontent
-                reviews_from_maincontent = []
-                if main_content_data.get("Reviews"):
-                    for review_item in main_content_data["Reviews"]:
-                        reviews_from_maincontent.append({
-                            "name": review_item.get("name"),
-                                "review": Markup(replace_placeholders(review_item.get("review", ""), "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                            })
+                # Prepare FAQ and Reviews from maincontent
+                faqs_from_maincontent = get_random_faqs(city_name, state_abbreviation, json_data, zip_codes, city_zip_code, state_name)
+                reviews_from_maincontent = get_random_reviews(city_name, state_abbreviation, json_data, zip_codes, city_zip_code, state_name)
                     
                 # Placeholder replacements for main_content_data fields
-                processed_main_content = {}
-                for key, value in main_content_data.items():
-                    if isinstance(value, str):
-                        processed_main_content[key] = Markup(replace_placeholders(value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                    elif isinstance(value, dict) and key == "CTA":
-                        # Special handling for CTA dictionary
-                        processed_cta = {}
-                        for cta_key, cta_value in value.items():
-                            if isinstance(cta_value, str):
-                                processed_cta[cta_key] = Markup(replace_placeholders(cta_value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                            else:
-                                processed_cta[cta_key] = cta_value
-                        processed_main_content[key] = processed_cta
-                    else:
-                        processed_main_content[key] = value # Keep other lists/dicts as is (e.g. FAQ, Reviews already processed)
+                processed_main_content = LazyContent(main_content_data, ("", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code), nested_keys=("CTA",))
 
                 # Fetch other cities in the same state
                 all_other_cities = get_other_cities_in_state(state_subdomain, city_info['city_name'])
@@ -488,7 +1239,7 @@ def handle_home():
                             })
 
                 return render_template(
-                    'city.html',
+                    resolve_template('city.html'),
                     state_name=state_name,
                     city_name=city_name,
                     city_zip_code=city_zip_code,
@@ -572,7 +1323,7 @@ def service_page(service_url):
             )
 
             return render_template(
-                'service.html',
+                resolve_template('service.html'),
                 state_name=state_name,
                 city_name=city_name,
                 city_zip_code=city_zip_code,
@@ -614,21 +1365,7 @@ def about_page():
         zip_codes = get_zip_codes_from_db(city_name)
 
         # Process main_content_data for HTML rendering and placeholder replacement
-        processed_main_content = {}
-        for key, value in main_content_data.items():
-            if isinstance(value, str):
-                processed_main_content[key] = Markup(replace_placeholders(value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-            elif isinstance(value, dict) and key == "CTA":
-                # Special handling for CTA dictionary
-                processed_cta = {}
-                for cta_key, cta_value in value.items():
-                    if isinstance(cta_value, str):
-                        processed_cta[cta_key] = Markup(replace_placeholders(cta_value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                    else:
-                        processed_cta[cta_key] = cta_value
-                processed_main_content[key] = processed_cta
-            else:
-                processed_main_content[key] = value
+        processed_main_content = LazyContent(main_content_data, ("", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code), nested_keys=("CTA",))
                 
         # Still keep these for backward compatibility
         about_us_content = processed_main_content.get("About Content", "")
@@ -645,7 +1382,7 @@ def about_page():
             )
 
         return render_template(
-            'about.html', 
+            resolve_template('about.html'), 
             state_name=state_name,
             city_name=city_name,
             city_zip_code=city_zip_code,
@@ -688,21 +1425,7 @@ def contact_page():
         zip_codes = get_zip_codes_from_db(city_name)
 
         # Process main_content_data for HTML rendering and placeholder replacement
-        processed_main_content = {}
-        for key, value in main_content_data.items():
-            if isinstance(value, str):
-                processed_main_content[key] = Markup(replace_placeholders(value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-            elif isinstance(value, dict) and key == "CTA":
-                # Special handling for CTA dictionary
-                processed_cta = {}
-                for cta_key, cta_value in value.items():
-                    if isinstance(cta_value, str):
-                        processed_cta[cta_key] = Markup(replace_placeholders(cta_value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                    else:
-                        processed_cta[cta_key] = cta_value
-                processed_main_content[key] = processed_cta
-            else:
-                processed_main_content[key] = value
+        processed_main_content = LazyContent(main_content_data, ("", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code), nested_keys=("CTA",))
                 
         # Use Address from required.json directly if available, otherwise use template
         # Assuming 'Address' in required.json is a pre-formatted string or a structured object
@@ -729,7 +1452,7 @@ def contact_page():
             ))
 
         return render_template(
-            'contact.html',
+            resolve_template('contact.html'),
             state_name=state_name,
             city_name=city_name,
             city_zip_code=city_zip_code,
@@ -755,14 +1478,6 @@ def services_page():
     json_data = request.json_data
     required_data = json_data.get("required", {})
     main_content_data = json_data.get("maincontent", {})
-    raw = json_data.get("services", {})
-    # if you normalized it at load time it'll be a dict {"Services": [...]} 
-    if isinstance(raw, dict):
-        services_list_src = raw.get("Services", [])
-    else:
-        # in case someone left it as a flat list
-        services_list_src = raw
-
     # Only support the new format (main-service-city-state)
     main_service, city_subdomain, state_subdomain = parse_subdomain()
     
@@ -779,26 +1494,8 @@ def services_page():
         state_abbreviation = state_subdomain.upper()
         zip_codes = get_zip_codes_from_db(city_name)
 
-        services_list = []
-        for service_item in services_list_src:
-            service_name = service_item.get("Service Name")
-            service_slug = service_item.get("slug")
-            if service_name and service_slug:
-                # Apply placeholder replacement to service name if needed, though typically not for a listing
-                # For this example, we'll assume the Service Name in services.json is final
-                # Use the main service in the URL if available
-                if main_service:
-                    # For new format: main-service-city-state.domain.com
-                    services_list.append({
-                        "name": service_name,
-                        "url": f"/{service_slug}" # Construct URL from slug
-                    })
-                else:
-                    # For old format: city-state.domain.com
-                    services_list.append({
-                        "name": service_name,
-                        "url": f"/{service_slug}" # Construct URL from slug
-                    })
+        # Listing of services with a name and slug, prebuilt per domain
+        services_list = get_service_catalog(json_data).services_listing
 
         meta_title_template = main_content_data.get("Services Page Title", main_content_data.get("Title", "Our Services in {city_name}, {state_abbreviation} - {company_name}"))
         meta_title = replace_placeholders(
@@ -811,24 +1508,10 @@ def services_page():
         )
         
         # Process main_content_data for HTML rendering and placeholder replacement
-        processed_main_content = {}
-        for key, value in main_content_data.items():
-            if isinstance(value, str):
-                processed_main_content[key] = Markup(replace_placeholders(value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-            elif isinstance(value, dict) and key == "CTA":
-                # Special handling for CTA dictionary
-                processed_cta = {}
-                for cta_key, cta_value in value.items():
-                    if isinstance(cta_value, str):
-                        processed_cta[cta_key] = Markup(replace_placeholders(cta_value, "", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code))
-                    else:
-                        processed_cta[cta_key] = cta_value
-                processed_main_content[key] = processed_cta
-            else:
-                processed_main_content[key] = value
+        processed_main_content = LazyContent(main_content_data, ("", city_name, state_abbreviation, state_name, required_data, zip_codes, city_zip_code), nested_keys=("CTA",))
 
         return render_template(
-            'services.html',
+            resolve_template('services.html'),
             state_name=state_name,
             city_name=city_name,
             city_zip_code=city_zip_code,
@@ -860,17 +1543,80 @@ def update_json(filename):
         
         # Relative path for cache invalidation (matching the path used in load_json_for_request)
         cache_path = f"domains/{main_domain}/{filename}"
-        cache.delete_memoized(load_json, cache_path)
+        json_cache.delete(cache_path)
+        render_cache.delete_domain(main_domain)
         
         return jsonify({"status": "success", "message": f"{filename} updated successfully! Cache refreshed."}), 200
     except Exception as e:
         return jsonify({"status": "failure", "message": str(e)}), 500
 
+def get_city_page_url(city_name, state_abbr, main_service):
+    city_subdomain_format = urllib.parse.quote(city_name.replace(' ', '-').lower())
+    return f"https://{main_service}-{city_subdomain_format}-{state_abbr}.{get_main_domain()}"
+
+def cacheable_json(payload, status=200):
+    response = jsonify(payload)
+    response.status_code = status
+    max_age = API_CACHE_MAX_AGE if status == 200 else API_NOT_FOUND_MAX_AGE
+    response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    return response
+
+@app.route('/api/zip/<zip_code>')
+def zip_lookup(zip_code):
+    required_data = request.json_data.get("required", {})
+    main_service = required_data.get("Main Service", "").lower().replace(" ", "-")
+    match = db_cache.find_city_by_zip(zip_code)
+    if not match or not main_service:
+        return cacheable_json({"status": "not_found", "zip": zip_code}, 404)
+    city_name, state_abbr = match
+    return cacheable_json({
+        "status": "success",
+        "zip": zip_code,
+        "city": city_name,
+        "state": state_abbr.upper(),
+        "state_name": db_cache.states.get(state_abbr),
+        "url": get_city_page_url(city_name, state_abbr, main_service)
+    })
+
+@app.route('/api/cities')
+def city_autocomplete():
+    required_data = request.json_data.get("required", {})
+    main_service = required_data.get("Main Service", "").lower().replace(" ", "-")
+    prefix = request.args.get("prefix", "")
+    limit = min(request.args.get("limit", 10, type=int), API_MAX_CITY_RESULTS)
+    cities = []
+    for city_name, state_abbr in db_cache.find_cities_by_prefix(prefix, limit):
+        cities.append({
+            "city": city_name,
+            "state": state_abbr.upper(),
+            "url": get_city_page_url(city_name, state_abbr, main_service) if main_service else None
+        })
+    return cacheable_json({"status": "success", "prefix": prefix, "cities": cities})
+
+@app.route('/admin/load-shedding')
+def load_shedding_report():
+    require_admin()
+    with load_shedding_lock:
+        stats = dict(load_shedding_stats)
+    stats["renders_in_flight"] = stats["admitted"] - stats["completed"]
+    stats["cached_renders"] = len(render_cache)
+    return jsonify(stats)
+
+@app.route('/admin/cache-stats')
+def cache_stats_report():
+    require_admin()
+    stats = {name: bounded.stats() for name, bounded in caches.items()}
+    # Compiled templates are code objects tied to the Jinja environment, so
+    # there is no meaningful byte size to report; the cap is on entries only
+    stats["templates"] = {"entries": len(app.jinja_env.cache), "max_entries": TEMPLATE_CACHE_SIZE}
+    stats["rate_limit_clients"] = client_limiter.stats()
+    return jsonify(stats)
+
 @app.errorhandler(404)
 def page_not_found(e):
     required_data = request.json_data.get("required", {})
     return render_template(
-        '404.html',
+        resolve_template('404.html'),
         required=required_data,
         favicon=required_data.get("favicon"),
         main_service=required_data.get("Main Service"),
@@ -0,0 +1,268 @@
+"""Local benchmarks and load tests for the city pages.
+
+Run from the project folder so newcities.db and domains/ resolve:
+
+    python bench.py loadtest
+    python bench.py lookups
+    python bench.py queries
+    python bench.py content
+"""
+import argparse
+import http.client
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app as site
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    print(f"{label:<32} n={len(samples):<6} "
+          f"p50={percentile(samples, 50) * 1000:9.3f}ms "
+          f"p99={percentile(samples, 99) * 1000:9.3f}ms "
+          f"max={max(samples) * 1000:9.3f}ms "
+          f"mean={statistics.mean(samples) * 1000:9.3f}ms")
+
+
+def city_hosts(domain, state, count):
+    main_service = "mold"
+    cities = site.get_cities_in_state(state)[:count]
+    return [f"{main_service}-{city.replace(' ', '-').lower()}-{state}.{domain}" for city in cities]
+
+
+def serve(port, admission_control, stale_after):
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    site.ADMISSION_CONTROL_ENABLED = admission_control
+    site.render_cache.timeout = stale_after
+    make_server("127.0.0.1", port, site.app, threaded=True).serve_forever()
+
+
+def start_server(port, admission_control, stale_after):
+    server = multiprocessing.Process(target=serve, args=(port, admission_control, stale_after), daemon=True)
+    server.start()
+    for _ in range(100):
+        try:
+            http.client.HTTPConnection("127.0.0.1", port, timeout=1).connect()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("local server did not start")
+
+
+def fetch(port, host, path, client_ip):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    start = time.perf_counter()
+    conn.request("GET", path, headers={"Host": host, "X-Real-IP": client_ip})
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return time.perf_counter() - start, response.status, response.getheader("X-Render-Cache")
+
+
+def run_burst(port, hosts, paths, rate, duration, clients):
+    """Open-loop crawler burst: requests arrive at ``rate`` per second whether
+    or not earlier ones have finished, spread over ``clients`` addresses."""
+    rng = random.Random(0)
+    total = int(rate * duration)
+    with ThreadPoolExecutor(max_workers=512) as pool:
+        start = time.perf_counter()
+        futures = []
+        for n in range(total):
+            delay = start + n / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            client = rng.randrange(clients)
+            futures.append(pool.submit(fetch, port, rng.choice(hosts), rng.choice(paths), f"10.0.{client // 256}.{client % 256}"))
+        return [future.result() for future in futures]
+
+
+def loadtest(args):
+    hosts = city_hosts(args.domain, args.state, args.cities)
+    paths = ["/", "/about", "/services"]
+    for admission_control in (False, True):
+        # Renders go stale immediately, so the burst has to re-render every
+        # page and shed requests can only fall back to the warmed copies.
+        server = start_server(args.port, admission_control, 0)
+        try:
+            for n, host in enumerate(hosts):
+                for path in paths:
+                    fetch(args.port, host, path, f"127.0.{n // 256}.{n % 256}")
+
+            results = run_burst(args.port, hosts, paths, args.rate, args.duration, args.clients)
+
+            label = "admission control on" if admission_control else "admission control off"
+            report(label, [elapsed for elapsed, _, _ in results])
+            statuses = {}
+            for _, status, cache_state in results:
+                key = f"{status} {cache_state or 'RENDERED'}"
+                statuses[key] = statuses.get(key, 0) + 1
+            print(f"{'':<32} responses={statuses}")
+            if admission_control:
+                conn = http.client.HTTPConnection("127.0.0.1", args.port, timeout=10)
+                conn.request("GET", "/admin/load-shedding", headers={"Host": args.domain})
+                print(f"{'':<32} counters={conn.getresponse().read().decode()}")
+        finally:
+            server.terminate()
+            server.join()
+
+
+def time_calls(func, inputs):
+    samples = []
+    for value in inputs:
+        start = time.perf_counter()
+        func(value)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def lookups(args):
+    cache = site.db_cache
+    names = [city.lower() for city, _ in cache.city_prefix_index]
+    prefixes = sorted({name[:length] for name in names for length in range(1, 5)})
+    zips = list(cache.zip_index)
+    print(f"{len(names)} cities, {len(zips)} zip codes, {len(prefixes)} distinct 1-4 char prefixes")
+
+    report("zip index", time_calls(cache.find_city_by_zip, zips))
+    report("prefix index", time_calls(lambda prefix: cache.find_cities_by_prefix(prefix, 10), prefixes))
+
+    def linear_scan(prefix):
+        return [entry for entry in cache.city_prefix_index if entry[0].lower().startswith(prefix)][:10]
+    report("prefix linear scan", time_calls(linear_scan, prefixes[::20]))
+
+    client = site.app.test_client()
+    host = {"Host": args.domain}
+    report("GET /api/zip/<zip>", time_calls(lambda zip_code: client.get(f"/api/zip/{zip_code}", headers=host), zips[::10]))
+    report("GET /api/cities?prefix=", time_calls(lambda prefix: client.get("/api/cities", query_string={"prefix": prefix}, headers=host), prefixes[::10]))
+
+
+def legacy_get_city_info(db_path, city_subdomain, state_abbr):
+    # get_city_info before the migration: a new connection and LOWER() scans per call
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute(
+        "SELECT city_name, main_zip_code FROM Cities WHERE LOWER(city_name)=? AND LOWER(state_code)=?",
+        (city_subdomain.replace('-', ' ').lower(), state_abbr.lower())
+    ).fetchone()
+    conn.close()
+    return row
+
+
+def queries(args):
+    import migrate_db
+
+    sample = random.Random(0).sample(site.db_cache.city_prefix_index, args.samples)
+    targets = [(city.replace(' ', '-').lower(), abbr) for city, abbr in sample]
+    zips = [zip_code for zip_code, _ in random.Random(0).sample(sorted(site.db_cache.zip_index.items()), args.samples)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        migrated_path = os.path.join(tmp, "newcities.db")
+        shutil.copyfile(site.DB_PATH, migrated_path)
+        migrate_db.migrate(migrated_path)
+
+        report("city lookup: before", time_calls(lambda t: legacy_get_city_info(site.DB_PATH, *t), targets))
+        site.db_local = threading.local()
+        report("city lookup: pooled, no index", time_calls(lambda t: site.get_city_info(*t), targets))
+        report("other cities: pooled, no index", time_calls(lambda t: site.get_other_cities_in_state(t[1], t[0]), targets))
+
+        site.DB_PATH = migrated_path
+        site.db_local = threading.local()
+        report("city lookup: after", time_calls(lambda t: site.get_city_info(*t), targets))
+        report("other cities: after", time_calls(lambda t: site.get_other_cities_in_state(t[1], t[0]), targets))
+
+        before = sqlite3.connect(f"file:{migrated_path}?mode=ro", uri=True)
+        report("zip -> city: LIKE scan", time_calls(
+            lambda z: before.execute("SELECT city_name FROM Cities WHERE ',' || zip_codes || ',' LIKE ?", (f"%,{z},%",)).fetchone(), zips))
+        report("zip -> city: CityZipCodes", time_calls(
+            lambda z: before.execute("SELECT c.city_name FROM CityZipCodes z JOIN Cities c ON c.id = z.city_id WHERE z.zip_code=?", (z,)).fetchone(), zips))
+        before.close()
+        site.get_db_connection()[0].close()
+
+
+class EagerContent(site.LazyContent):
+    """LazyContent that expands every field up front, like the views used to."""
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for key in self.source:
+            value = self[key]
+            if isinstance(value, site.LazyContent):
+                for nested_key in value.source:
+                    value[nested_key]
+
+
+def content(args):
+    site.ADMISSION_CONTROL_ENABLED = False
+    site.DB_RELOAD_INTERVAL = 0
+    host = {"Host": f"mold-allen-tx.{args.domain}"}
+    client = site.app.test_client()
+    client.get("/", headers=host)
+
+    # Simulate a content-heavy maincontent.json: keys no template reads
+    main_content = site.load_json(f"domains/{args.domain}/maincontent.json")
+    for n in range(args.extra_keys):
+        main_content[f"Extra Section {n}"] = "<p>{Trusted|Local|Expert} [Service] help in [City], [State] ([Zip Codes]).</p>" * 20
+
+    print(f"{len(main_content)} maincontent keys ({args.extra_keys} unused by templates)")
+    lazy_content = site.LazyContent
+    for path in ["/", "/about", "/contact", "/services", "/water-damage-restoration"]:
+        results = {}
+        for label, cls in (("eager", EagerContent), ("lazy", lazy_content)):
+            site.LazyContent = cls
+            samples = time_calls(lambda _: client.get(path, headers=host), range(args.requests))
+            results[label] = statistics.mean(samples)
+            report(f"{path} {label}", samples)
+        print(f"{'':<32} saved {(results['eager'] - results['lazy']) * 1000:.3f}ms per request "
+              f"({(1 - results['lazy'] / results['eager']) * 100:.0f}%)")
+    site.LazyContent = lazy_content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_loadtest = subparsers.add_parser("loadtest", help="crawler burst against a local server, with and without admission control")
+    parser_loadtest.add_argument("--domain", default="demo.local:8000")
+    parser_loadtest.add_argument("--state", default="tx")
+    parser_loadtest.add_argument("--cities", type=int, default=50)
+    parser_loadtest.add_argument("--clients", type=int, default=200, help="distinct crawler addresses")
+    parser_loadtest.add_argument("--rate", type=float, default=300, help="requests per second offered")
+    parser_loadtest.add_argument("--duration", type=float, default=5, help="seconds of offered load")
+    parser_loadtest.add_argument("--port", type=int, default=8765)
+    parser_loadtest.set_defaults(func=loadtest)
+
+    parser_lookups = subparsers.add_parser("lookups", help="zip and city prefix index lookups over the full dataset")
+    parser_lookups.add_argument("--domain", default="demo.local:8000")
+    parser_lookups.set_defaults(func=lookups)
+
+    parser_queries = subparsers.add_parser("queries", help="SQLite query latency before and after migrate_db.py")
+    parser_queries.add_argument("--samples", type=int, default=2000)
+    parser_queries.set_defaults(func=queries)
+
+    parser_content = subparsers.add_parser("content", help="per-route render time with eager vs lazy placeholder expansion")
+    parser_content.add_argument("--domain", default="demo.local:8000")
+    parser_content.add_argument("--extra-keys", type=int, default=40, help="unused maincontent fields to add")
+    parser_content.add_argument("--requests", type=int, default=200)
+    parser_content.set_defaults(func=content)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Add normalized lookup columns, indexes and a zip table to newcities.db.
+
+Safe to run again after the Cities rows are refreshed. Run it on a copy and
+move the copy into place; the app's open connections assume the live file
+never changes underneath them:
+
+    cp newcities.db newcities.db.new
+    python migrate_db.py newcities.db.new
+    mv newcities.db.new newcities.db
+"""
+import argparse
+import os
+import sqlite3
+
+# The file app.py serves from; migrating it in place breaks running workers
+LIVE_DB_PATH = "newcities.db"
+
+
+def city_slug(city_name):
+    # Same format the city subdomains use: main-service-<city-slug>-state
+    return city_name.strip().lower().replace(' ', '-')
+
+
+def migrate(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    with conn:
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(Cities)")}
+        if 'city_slug' not in columns:
+            conn.execute("ALTER TABLE Cities ADD COLUMN city_slug TEXT")
+        if 'state_code_lc' not in columns:
+            conn.execute("ALTER TABLE Cities ADD COLUMN state_code_lc TEXT")
+
+        rows = conn.execute("SELECT id, city_name, state_code, main_zip_code, zip_codes FROM Cities").fetchall()
+        conn.executemany(
+            "UPDATE Cities SET city_slug=?, state_code_lc=? WHERE id=?",
+            [(city_slug(row['city_name']), row['state_code'].strip().lower(), row['id']) for row in rows]
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cities_state_slug ON Cities (state_code_lc, city_slug)")
+
+        # zip_codes is a comma-joined TEXT column; keep a normalized copy next to it
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS CityZipCodes (
+              city_id INTEGER NOT NULL REFERENCES Cities(id),
+              zip_code TEXT NOT NULL,
+              is_main INTEGER NOT NULL DEFAULT 0,
+              PRIMARY KEY (city_id, zip_code)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("DELETE FROM CityZipCodes")
+        zip_rows = []
+        for row in rows:
+            main_zip = row['main_zip_code'].strip()
+            zips = {z.strip() for z in row['zip_codes'].split(',') if z.strip()}
+            if main_zip:
+                zips.add(main_zip)
+            zip_rows.extend((row['id'], zip_code, int(zip_code == main_zip)) for zip_code in zips)
+        conn.executemany("INSERT INTO CityZipCodes (city_id, zip_code, is_main) VALUES (?, ?, ?)", zip_rows)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_city_zip_codes_zip ON CityZipCodes (zip_code)")
+
+    conn.execute("ANALYZE")
+    conn.execute("VACUUM")
+    conn.close()
+    return len(rows), len(zip_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db_path", help="a copy of newcities.db, not the live file")
+    args = parser.parse_args()
+    if os.path.realpath(args.db_path) == os.path.realpath(LIVE_DB_PATH):
+        parser.error(f"refusing to migrate the live {LIVE_DB_PATH}; copy it, migrate the copy and mv it into place")
+    cities, zips = migrate(args.db_path)
+    print(f"Migrated {cities} cities and {zips} zip codes in {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()